@@ -1,11 +1,18 @@
+import cProfile
 import datetime
+import hashlib
+import pstats
 import threading
-from typing import List, Tuple, Dict, Any, Optional
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Tuple, Dict, Any, Optional, Set
 
 import pytz
 from app.helper.sites import SitesHelper
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from qbittorrentapi import TorrentDictionary
 from app.core.config import settings
 from app.helper.downloader import DownloaderHelper
 from app.log import logger
@@ -25,7 +32,7 @@ class TagMod(_PluginBase):
     # 插件图标
     plugin_icon = "Youtube-dl_B.png"
     # 插件版本
-    plugin_version = "1.1" # 如果功能有显著变化，可以考虑更新版本号
+    plugin_version = "1.6" # 如果功能有显著变化，可以考虑更新版本号
     # 插件作者
     plugin_author = "MayflyDestinyn"
     # 作者主页
@@ -53,9 +60,48 @@ class TagMod(_PluginBase):
     _interval_cron = "0 12 * * *"
     _interval_time = 24
     _interval_unit = "小时"
+    _interval_min = 5
+    _interval_max = 60
+    # 自适应模式下当前的执行间隔(分钟)及下次执行时间
+    _adaptive_interval = 5
+    _next_run_time: Optional[datetime.datetime] = None
     _downloaders = None
     _tracker_map = "tracker地址:站点标签"
     _save_path_map = "保存地址:标签"
+    _skip_unchanged = False
+    # 下载器变更标记 {下载器名称: 上次成功运行时的标记}
+    _change_marks: Dict[str, Dict[str, Any]] = {}
+    # 运行统计
+    _run_stats: Dict[str, Any] = {}
+    # qB增量同步中与打标签相关的字段
+    _qb_relevant_fields = {"tags", "save_path", "tracker", "added_on"}
+    # 写标签失败的重试队列 {下载器:hash: 重试项}
+    _retry_queue: Dict[str, Dict[str, Any]] = {}
+    _retry_lock = threading.Lock()
+    # 重试队列有未保存的修改，在一次扫描、重试批次或事件结束时统一保存
+    _retry_dirty = False
+    # 每批重试数量、最大重试次数、退避基数及上限(秒)
+    _retry_batch_size = 10
+    _retry_max_attempts = 8
+    _retry_base_delay = 60
+    _retry_max_delay = 6 * 3600
+    # 性能分析：分析下次运行、分析接下来N次事件、展示的热点数量
+    _profile_next = False
+    _profile_events = 0
+    _profile_top = 20
+    _profile_lock = threading.Lock()
+    # 进行中的采集 {"thread": 线程ID, "snapshot": 快照, "size": 快照时的内存占用}
+    _profile_capture: Optional[Dict[str, Any]] = None
+    # 保留的性能分析结果数量
+    _profile_keep = 10
+    # 标签倒排索引 {下载器: {标签: {hash}}}，及正排 {下载器: {hash: {标签}}} 用于增量更新
+    _tag_index: Dict[str, Dict[str, Set[str]]] = {}
+    _torrent_tags: Dict[str, Dict[str, Set[str]]] = {}
+    # 各下载器索引完整重建的时间
+    _index_time: Dict[str, str] = {}
+    # 重建期间的增量写入日志 {下载器: [(操作, hash, 标签)]}，重建时回放，避免丢失获取列表之后的写入
+    _index_journal: Dict[str, List[Tuple[str, str, List[str]]]] = {}
+    _index_lock = threading.Lock()
 
     def init_plugin(self, config: dict = None):
         self.sites_helper = SitesHelper()
@@ -70,9 +116,33 @@ class TagMod(_PluginBase):
             self._interval_cron = config.get("interval_cron") or "0 12 * * *"
             self._interval_time = self.str_to_number(config.get("interval_time"), 24)
             self._interval_unit = config.get("interval_unit") or "小时"
+            self._interval_min = self.str_to_number(config.get("interval_min"), 5)
+            self._interval_max = self.str_to_number(config.get("interval_max"), 60)
             self._downloaders = config.get("downloaders")
             self._tracker_map = config.get("tracker_map") or "tracker地址:站点标签"
             self._save_path_map = config.get("save_path_map") or "保存地址:标签"
+            self._skip_unchanged = config.get("skip_unchanged")
+            self._profile_next = config.get("profile_next")
+            self._profile_events = self.str_to_number(config.get("profile_events"), 0)
+            self._profile_top = self.str_to_number(config.get("profile_top"), 20)
+
+        if self._interval_min < 5:
+            self._interval_min = 5
+            logger.info(f"{self.LOG_TAG}自适应间隔: 最小不少于5分钟, 防止执行间隔太短任务冲突")
+        if self._interval_max < self._interval_min:
+            self._interval_max = self._interval_min
+        self._adaptive_interval = self._interval_min
+        self._next_run_time = None
+
+        # 配置变化后标记及索引失效，首次运行总是完整扫描
+        self._change_marks = {}
+        with self._index_lock:
+            self._tag_index = {}
+            self._torrent_tags = {}
+            self._index_time = {}
+            self._index_journal = {}
+        self._run_stats = self.get_data("run_stats") or {}
+        self._retry_queue = self.get_data("retry_queue") or {}
 
         # 停止现有任务
         self.stop_service()
@@ -126,7 +196,73 @@ class TagMod(_PluginBase):
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [{
+            "path": "/stats",
+            "endpoint": self.get_stats,
+            "methods": ["GET"],
+            "summary": "运行统计",
+            "description": "获取自动标签的运行次数、跳过次数等统计信息",
+        }, {
+            "path": "/profile",
+            "endpoint": self.get_profile,
+            "methods": ["GET"],
+            "summary": "性能分析结果",
+            "description": "获取最近几次性能分析的热点函数和内存分配位置",
+        }, {
+            "path": "/tag_hashes",
+            "endpoint": self.get_tag_hashes,
+            "methods": ["GET"],
+            "summary": "按标签查询种子",
+            "description": "从标签索引中查询各下载器带有指定标签的种子hash，无需重新获取下载器种子列表",
+        }, {
+            "path": "/tag_counts",
+            "endpoint": self.get_tag_counts,
+            "methods": ["GET"],
+            "summary": "标签种子数量",
+            "description": "从标签索引中统计各下载器每个标签的种子数量",
+        }]
+
+    def get_tag_hashes(self, apikey: str, tag: str, downloader: str = None) -> Dict[str, Any]:
+        """
+        API: 查询带有指定标签的种子hash
+        """
+        if apikey != settings.API_TOKEN:
+            return {"success": False, "message": "API密钥错误"}
+        with self._index_lock:
+            data = {name: sorted(index.get(tag, set()))
+                    for name, index in self._tag_index.items()
+                    if not downloader or name == downloader}
+        return {"success": True, "data": data}
+
+    def get_tag_counts(self, apikey: str, downloader: str = None) -> Dict[str, Any]:
+        """
+        API: 查询各标签的种子数量
+        """
+        if apikey != settings.API_TOKEN:
+            return {"success": False, "message": "API密钥错误"}
+        with self._index_lock:
+            data = {name: {
+                "indexed_at": self._index_time.get(name),
+                "torrents": len(self._torrent_tags.get(name, {})),
+                "tags": {tag: len(hashes) for tag, hashes in index.items()}
+            } for name, index in self._tag_index.items() if not downloader or name == downloader}
+        return {"success": True, "data": data}
+
+    def get_profile(self, apikey: str) -> Dict[str, Any]:
+        """
+        API: 获取最近的性能分析结果
+        """
+        if apikey != settings.API_TOKEN:
+            return {"success": False, "message": "API密钥错误"}
+        return {"success": True, "data": self.get_data("profile") or []}
+
+    def get_stats(self, apikey: str) -> Dict[str, Any]:
+        """
+        API: 获取运行统计
+        """
+        if apikey != settings.API_TOKEN:
+            return {"success": False, "message": "API密钥错误"}
+        return {"success": True, "data": {**self._run_stats, "retry_queue": len(self._retry_queue)}}
 
     def get_service(self) -> List[Dict[str, Any]]:
         """
@@ -139,94 +275,173 @@ class TagMod(_PluginBase):
             "kwargs": {} # 定时器参数
         }]
         """
-        if self._enabled:
-            if self._interval == "计划任务" or self._interval == "固定间隔":
-                if self._interval == "固定间隔":
-                    if self._interval_unit == "小时":
-                        return [{
-                            "id": "Tag",
-                            "name": "自动补全标签",
-                            "trigger": "interval",
-                            "func": self._complemented_tags,
-                            "kwargs": {
-                                "hours": self._interval_time
-                            }
-                        }]
-                    else:
-                        if self._interval_time < 5:
-                            self._interval_time = 5
-                            logger.info(f"{self.LOG_TAG}启动定时服务: 最小不少于5分钟, 防止执行间隔太短任务冲突")
-                        return [{
-                            "id": "Tag",
-                            "name": "自动补全标签",
-                            "trigger": "interval",
-                            "func": self._complemented_tags,
-                            "kwargs": {
-                                "minutes": self._interval_time
-                            }
-                        }]
+        if not self._enabled:
+            return []
+        services = self._get_tag_services()
+        # 失败重试在两次扫描之间分批处理
+        services.append({
+            "id": "TagRetry",
+            "name": "自动标签失败重试",
+            "trigger": "interval",
+            "func": self._process_retry_queue,
+            "kwargs": {
+                "minutes": 1
+            }
+        })
+        return services
+
+    def _get_tag_services(self) -> List[Dict[str, Any]]:
+        """
+        按定时任务配置生成补全标签服务
+        """
+        if self._interval == "自适应":
+            # 按最小间隔轮询，是否到期由 _adaptive_tags 根据种子变化情况决定
+            return [{
+                "id": "Tag",
+                "name": "自动补全标签",
+                "trigger": "interval",
+                "func": self._adaptive_tags,
+                "kwargs": {
+                    "minutes": self._interval_min
+                }
+            }]
+        if self._interval == "计划任务" or self._interval == "固定间隔":
+            if self._interval == "固定间隔":
+                if self._interval_unit == "小时":
+                    return [{
+                        "id": "Tag",
+                        "name": "自动补全标签",
+                        "trigger": "interval",
+                        "func": self._complemented_tags,
+                        "kwargs": {
+                            "hours": self._interval_time
+                        }
+                    }]
                 else:
+                    if self._interval_time < 5:
+                        self._interval_time = 5
+                        logger.info(f"{self.LOG_TAG}启动定时服务: 最小不少于5分钟, 防止执行间隔太短任务冲突")
                     return [{
                         "id": "Tag",
                         "name": "自动补全标签",
-                        "trigger": CronTrigger.from_crontab(self._interval_cron),
+                        "trigger": "interval",
                         "func": self._complemented_tags,
-                        "kwargs": {}
+                        "kwargs": {
+                            "minutes": self._interval_time
+                        }
                     }]
+            else:
+                return [{
+                    "id": "Tag",
+                    "name": "自动补全标签",
+                    "trigger": CronTrigger.from_crontab(self._interval_cron),
+                    "func": self._complemented_tags,
+                    "kwargs": {}
+                }]
         return []
 
     @staticmethod
     def str_to_number(s: str, i: int) -> int:
         try:
             return int(s)
-        except ValueError:
+        except (ValueError, TypeError):
             return i
 
-    def _complemented_tags(self):
-        if not self.service_infos:
+    def _adaptive_tags(self):
+        """
+        自适应模式：未到下次执行时间则跳过，执行后根据打标签的种子数调整间隔
+        """
+        now = datetime.datetime.now()
+        # 留出余量，避免调度抖动导致错过一个周期
+        if self._next_run_time and now + datetime.timedelta(seconds=30) < self._next_run_time:
             return
-        logger.info(f"{self.LOG_TAG}开始执行 ...")
-        # 所有站点索引
-        indexers_set = set(indexer.get("name") for indexer in self.sites_helper.get_indexers() if indexer.get("name"))
+        tagged = self._complemented_tags() or 0
+        if tagged:
+            self._adaptive_interval = max(self._interval_min, self._adaptive_interval // 2)
+        else:
+            self._adaptive_interval = min(self._interval_max, self._adaptive_interval * 2)
+        self._next_run_time = now + datetime.timedelta(minutes=self._adaptive_interval)
+        self._run_stats["adaptive_interval"] = self._adaptive_interval
+        self.save_data("run_stats", self._run_stats)
+        logger.info(f"{self.LOG_TAG}自适应间隔: 本次补全 {tagged} 个种子, 下次执行间隔 {self._adaptive_interval} 分钟")
 
-        parsed_tracker_map = {}
-        if self._tracker_map and self._tracker_map != "tracker地址:站点标签":
-            for item in self._tracker_map.splitlines():
-                if ":" in item:
-                    parts = item.split(":", 1)
-                    if parts[0].strip() and parts[1].strip():
-                        parsed_tracker_map[parts[0].strip()] = parts[1].strip()
+    def _shorten_interval(self):
+        """
+        自适应模式：有新种子加入时缩短间隔并提前下次执行时间
+        """
+        if self._interval != "自适应":
+            return
+        self._adaptive_interval = max(self._interval_min, self._adaptive_interval // 2)
+        next_run_time = datetime.datetime.now() + datetime.timedelta(minutes=self._adaptive_interval)
+        if not self._next_run_time or next_run_time < self._next_run_time:
+            self._next_run_time = next_run_time
 
-        parsed_save_path_map = {}
-        if self._save_path_map and self._save_path_map != "保存地址:标签":
-            for item in self._save_path_map.splitlines():
-                if ":" in item:
-                    parts = item.split(":", 1)
-                    if parts[0].strip() and parts[1].strip():
-                        parsed_save_path_map[parts[0].strip()] = parts[1].strip()
+    def _complemented_tags(self) -> int:
+        """
+        扫描所有下载器补全标签
+        :return: 本次打上标签的种子数
+        """
+        # 拿到采集锁后才消耗请求，否则保留到下次运行
+        if self._profile_next and self._profile_lock.acquire(blocking=False):
+            self._profile_next = False
+            self._save_profile_request("profile_next", False)
+            return self._profiled("run", self._complemented_tags) or 0
+        if not self.service_infos:
+            return 0
+        logger.info(f"{self.LOG_TAG}开始执行 ...")
+        # 站点索引及映射规则
+        rules = self._get_tag_rules()
+        indexers_set = rules[0]
 
-        for service in self.service_infos.values():
+        indexers_digest = hashlib.md5(",".join(sorted(indexers_set)).encode("utf-8")).hexdigest()
+        services = self.service_infos.values()
+        skipped_downloaders = []
+        tagged = 0
+        for service in services:
             downloader = service.name
             downloader_obj = service.instance
-            logger.info(f"{self.LOG_TAG}开始扫描下载器 {downloader} ...")
             if not downloader_obj: # Should be caught by service_infos active check, but good to have
                 logger.error(f"{self.LOG_TAG} 获取下载器失败 {downloader}")
                 continue
-            # 获取下载器中的种子
-            torrents, error = downloader_obj.get_torrents()
+            # 从获取种子列表(含变更检测)起的增量写入记入日志，重建索引时回放
+            self._begin_index_rebuild(downloader=downloader)
+            change_mark, torrents = None, None
+            # 变更检测：自上次成功运行后没有相关变化则跳过完整扫描
+            if self._skip_unchanged:
+                unchanged, change_mark, torrents = self._check_unchanged(service=service, indexers_digest=indexers_digest)
+                if unchanged:
+                    logger.info(f"{self.LOG_TAG}下载器 {downloader} 自上次运行后无变化，跳过扫描")
+                    self._cancel_index_rebuild(downloader=downloader)
+                    self._change_marks[downloader] = change_mark
+                    skipped_downloaders.append(downloader)
+                    continue
+            logger.info(f"{self.LOG_TAG}开始扫描下载器 {downloader} ...")
+            scan_failed = False
+            # 获取下载器中的种子，变更检测已拿到完整列表时直接复用
+            if torrents is not None:
+                error = False
+            else:
+                torrents, error = downloader_obj.get_torrents()
             # 如果下载器获取种子发生错误 或 没有种子 则跳过
             if error or not torrents:
                 if error:
                     logger.error(f"{self.LOG_TAG}下载器 {downloader} 获取种子列表失败: {error}")
+                    self._cancel_index_rebuild(downloader=downloader)
                 else:
                     logger.info(f"{self.LOG_TAG}下载器 {downloader} 没有种子.")
+                    self._rebuild_tag_index(service=service, torrents=[])
+                    if change_mark:
+                        self._change_marks[downloader] = change_mark
                 continue
             logger.info(f"{self.LOG_TAG}下载器 {downloader} 分析种子信息中 ({len(torrents)} 个种子)...")
+            # 以完整列表重建标签索引，之后的写入增量更新
+            self._rebuild_tag_index(service=service, torrents=torrents)
             for torrent in torrents:
                 try:
                     if self._event.is_set():
                         logger.info(f"{self.LOG_TAG}停止服务")
-                        return
+                        self._flush_retry_queue()
+                        return tagged
                     # 获取种子hash
                     _hash = self._get_hash(torrent=torrent, dl_type=service.type)
                     # 获取种子存储地址
@@ -235,54 +450,195 @@ class TagMod(_PluginBase):
                         logger.debug(f"{self.LOG_TAG}种子缺少 HASH ({_hash}) 或路径 ({_path})，跳过.")
                         continue
                         
-                    torrent_labels_to_apply = []
-                    # 1. 从保存路径应用标签
-                    for key, label in parsed_save_path_map.items():
-                        if key in _path:
-                            torrent_labels_to_apply.append(label)
-                            break 
-                    
-                    site_tag_from_rules = None
-                    current_torrent_tags = self._get_tags(torrent=torrent, dl_type=service.type)
-
-                    # 2. 确定是否需要添加站点标签
-                    apply_tracker_based_site_tag = True
-                    if not self._cover: # 如果不是覆盖模式
-                        if indexers_set.intersection(set(current_torrent_tags)): # 检查现有标签是否已有站点标签
-                            apply_tracker_based_site_tag = False 
-                    
-                    if apply_tracker_based_site_tag:
-                        trackers = self._get_trackers(torrent=torrent, dl_type=service.type)
-                        for tracker_url in trackers:
-                            # 先从自定义tracker map找
-                            for key, label in parsed_tracker_map.items():
-                                if key in tracker_url:
-                                    site_tag_from_rules = label
-                                    break
-                            if site_tag_from_rules:
-                                break
-                            # 再从站点助手根据域名找
-                            domain = StringUtils.get_url_domain(tracker_url)
-                            site_info = self.sites_helper.get_indexer(domain)
-                            if site_info:
-                                site_tag_from_rules = site_info.get("name")
-                                break
-                        if site_tag_from_rules and site_tag_from_rules not in torrent_labels_to_apply:
-                            torrent_labels_to_apply.append(site_tag_from_rules)
-
-                    original_tags_for_api = current_torrent_tags
-                    if self._cover:
-                        if service.type == "qbittorrent" and current_torrent_tags and any(t.strip() for t in current_torrent_tags):
-                             downloader_obj.qbc.torrents_remove_tags(torrent_hashes=_hash, tags=current_torrent_tags)
-                        original_tags_for_api = [] # 空列表表示覆盖模式下没有“原始”标签去比较差异
-
-                    if torrent_labels_to_apply:
-                        unique_labels_to_apply = list(dict.fromkeys(torrent_labels_to_apply)) # 保持顺序去重
-                        self._set_torrent_info(service=service, _hash=_hash, _tags=unique_labels_to_apply, _original_tags=original_tags_for_api)
+                    if self._tag_torrent(service=service, torrent=torrent, _hash=_hash, _path=_path, rules=rules):
+                        tagged += 1
                 except Exception as e:
                     logger.error(
                         f"{self.LOG_TAG}分析种子信息时发生了错误 (Hash: {_hash if '_hash' in locals() else 'N/A'}): {str(e)}", exc_info=True)
-        logger.info(f"{self.LOG_TAG}执行完成")
+                    # 已加入重试队列的由重试服务处理，无法重试的才需要下次完整扫描
+                    if not ('_hash' in locals() and _hash
+                            and self._add_retry(downloader=downloader, _hash=_hash, error=str(e))):
+                        scan_failed = True
+            # 种子列表仍在内存中，供性能分析记录内存分配
+            self._profile_checkpoint()
+            # 只有完整成功的扫描才更新标记，否则下次仍然完整扫描
+            if change_mark and not scan_failed:
+                self._change_marks[downloader] = change_mark
+        self._flush_retry_queue()
+        self._record_run(downloaders=[service.name for service in services], skipped=skipped_downloaders, tagged=tagged)
+        if skipped_downloaders:
+            logger.info(f"{self.LOG_TAG}执行完成，跳过无变化的下载器: {','.join(skipped_downloaders)}")
+        else:
+            logger.info(f"{self.LOG_TAG}执行完成")
+        return tagged
+
+    def _check_unchanged(self, service: ServiceInfo,
+                         indexers_digest: str) -> Tuple[bool, Optional[Dict[str, Any]], Optional[List[Any]]]:
+        """
+        低成本检查下载器自上次成功运行后是否有与打标签相关的变化
+        qB 使用增量同步的rid，TR 使用仅含少量字段的种子列表摘要
+        :return: (是否无变化, 本次标记, 完整种子列表)，只有qB全量同步时才返回种子列表供扫描复用，
+                 检查失败时返回 (False, None, None)
+        """
+        last_mark = self._change_marks.get(service.name)
+        try:
+            if service.type == "qbittorrent":
+                last_rid = last_mark.get("rid", 0) if last_mark else 0
+                maindata = service.instance.qbc.sync_maindata(rid=last_rid)
+                mark = {"rid": maindata.get("rid"), "indexers": indexers_digest}
+                # 已删除的种子直接从标签索引中移除
+                for _hash in maindata.get("torrents_removed") or []:
+                    self._index_remove(downloader=service.name, _hash=_hash)
+                if maindata.get("full_update"):
+                    # qB 没有单独获取rid的接口，首次或rid失效时的全量同步本身就是完整列表，直接复用，避免再获取一次
+                    torrents = [TorrentDictionary(data={**info, "hash": _hash}, client=service.instance.qbc)
+                                for _hash, info in (maindata.get("torrents") or {}).items()]
+                    return False, mark, torrents
+                if not last_mark or last_mark.get("indexers") != indexers_digest:
+                    return False, mark, None
+                for changes in (maindata.get("torrents") or {}).values():
+                    if self._qb_relevant_fields.intersection(changes.keys()):
+                        return False, mark, None
+                return True, mark, None
+            else:
+                # recently-active 只覆盖最近60秒，无法证明两次运行之间没有变化，这里使用摘要
+                torrents = service.instance.trc.get_torrents(arguments=["id", "hashString", "labels", "downloadDir"])
+                digest = hashlib.md5()
+                for item in sorted(f"{torrent.hashString}|{torrent.download_dir}|{','.join(sorted(torrent.labels or []))}"
+                                   for torrent in torrents):
+                    digest.update(item.encode("utf-8"))
+                mark = {"digest": f"{len(torrents)}:{digest.hexdigest()}", "indexers": indexers_digest}
+                return last_mark == mark, mark, None
+        except Exception as e:
+            logger.debug(f"{self.LOG_TAG}下载器 {service.name} 变更检测失败，执行完整扫描: {str(e)}")
+            return False, None, None
+
+    def _update_config_item(self, key: str, value: Any):
+        """
+        更新单个配置项
+        """
+        config = self.get_config() or {}
+        config[key] = value
+        self.update_config(config)
+
+    def _save_profile_request(self, key: str, value: Any):
+        """
+        已持有采集锁时保存消耗后的采集请求，保存失败不影响本次采集，也不能让锁无法释放
+        """
+        try:
+            self._update_config_item(key, value)
+        except Exception as e:
+            logger.error(f"{self.LOG_TAG}保存性能分析配置失败: {str(e)}")
+
+    def _profiled(self, name: str, func, *args, **kwargs):
+        """
+        使用 cProfile 和 tracemalloc 采集一次执行，调用方需已持有 _profile_lock，结束后释放
+        """
+        start_tracing = not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        self._profile_capture = {"thread": threading.get_ident(), "snapshot": None, "size": 0}
+        profiler = cProfile.Profile()
+        start_time = time.time()
+        try:
+            profiler.enable()
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            duration = time.time() - start_time
+            _, peak = tracemalloc.get_traced_memory()
+            # 优先使用执行过程中内存占用最高时的快照，执行结束后大部分数据已释放
+            snapshot = self._profile_capture.get("snapshot") or tracemalloc.take_snapshot()
+            self._profile_capture = None
+            if start_tracing:
+                tracemalloc.stop()
+            try:
+                self._save_profile(name=name, profiler=profiler, snapshot=snapshot, duration=duration, peak=peak)
+            except Exception as e:
+                logger.error(f"{self.LOG_TAG}保存性能分析结果失败: {str(e)}")
+            finally:
+                self._profile_lock.release()
+
+    def _profile_checkpoint(self):
+        """
+        采集进行中时，在运行数据仍存活的位置记录内存快照，只保留占用最高的一份
+        """
+        capture = self._profile_capture
+        if not capture or capture.get("thread") != threading.get_ident():
+            return
+        current, _ = tracemalloc.get_traced_memory()
+        if current > capture.get("size", 0):
+            capture["snapshot"] = tracemalloc.take_snapshot()
+            capture["size"] = current
+
+    def _save_profile(self, name: str, profiler: cProfile.Profile, snapshot: tracemalloc.Snapshot,
+                      duration: float, peak: int):
+        """
+        保存性能分析文件到插件数据目录，并记录热点函数和内存分配位置摘要
+        """
+        profile_path = self.get_data_path() / "profile"
+        profile_path.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.datetime.now(tz=pytz.timezone(settings.TZ))
+        file_prefix = profile_path / f"{name}_{timestamp.strftime('%Y%m%d%H%M%S%f')}"
+        profiler.dump_stats(f"{file_prefix}.prof")
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        snapshot.dump(f"{file_prefix}.tracemalloc")
+
+        # 按累计耗时排序，能直观看出列表、tracker、站点匹配、写标签各阶段的耗时
+        function_stats = sorted(pstats.Stats(profiler).stats.items(), key=lambda item: item[1][3], reverse=True)
+        functions = [{
+            "function": f"{filename}:{lineno}({funcname})",
+            "calls": nc,
+            "tottime": round(tt, 4),
+            "cumtime": round(ct, 4)
+        } for (filename, lineno, funcname), (cc, nc, tt, ct, callers) in function_stats[:self._profile_top]]
+        allocations = [{
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count
+        } for stat in snapshot.statistics("lineno")[:self._profile_top]]
+
+        profiles = self.get_data("profile") or []
+        profiles.insert(0, {
+            "name": name,
+            "time": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            "duration": round(duration, 3),
+            "peak_kb": round(peak / 1024, 1),
+            "profile_file": f"{file_prefix}.prof",
+            "tracemalloc_file": f"{file_prefix}.tracemalloc",
+            "functions": functions,
+            "allocations": allocations
+        })
+        # 删除超出保留数量的分析文件，避免目录无限增长
+        for expired in profiles[self._profile_keep:]:
+            for file_key in ("profile_file", "tracemalloc_file"):
+                if expired.get(file_key):
+                    Path(expired[file_key]).unlink(missing_ok=True)
+        self.save_data("profile", profiles[:self._profile_keep])
+        logger.info(f"{self.LOG_TAG}性能分析完成，耗时 {duration:.3f} 秒，结果已保存到 {file_prefix}.prof")
+
+    def _record_run(self, downloaders: List[str], skipped: List[str], tagged: int):
+        """
+        记录运行统计，所有下载器都无变化时计为一次跳过的运行
+        """
+        stats = self._run_stats
+        stats["runs"] = stats.get("runs", 0) + 1
+        run_skipped = bool(downloaders) and set(downloaders) == set(skipped)
+        if run_skipped:
+            stats["skipped_runs"] = stats.get("skipped_runs", 0) + 1
+        downloader_stats = stats.setdefault("downloaders", {})
+        for downloader in downloaders:
+            item = downloader_stats.setdefault(downloader, {"scanned": 0, "skipped": 0})
+            if downloader in skipped:
+                item["skipped"] += 1
+            else:
+                item["scanned"] += 1
+        stats["last_run"] = datetime.datetime.now(tz=pytz.timezone(settings.TZ)).strftime("%Y-%m-%d %H:%M:%S")
+        stats["last_skipped"] = run_skipped
+        stats["last_tagged"] = tagged
+        self.save_data("run_stats", stats)
 
     @eventmanager.register(EventType.DownloadAdded)
     def download_added(self, event: Event):
@@ -293,14 +649,20 @@ class TagMod(_PluginBase):
             logger.debug(f"{self.LOG_TAG}DownloadAdded event missing data.")
             return
 
-        try:
-            downloader_name = event.event_data.get("downloader")
-            _hash = event.event_data.get("hash")
+        # 拿到采集锁后才消耗次数；采集进行中(含被 _profiled 调用)时锁已被占用，不会重复计数
+        if self._profile_events > 0 and self._profile_lock.acquire(blocking=False):
+            self._profile_events -= 1
+            self._save_profile_request("profile_events", str(self._profile_events))
+            return self._profiled("event", self.download_added, event)
 
-            if not downloader_name or not _hash:
-                logger.info(f"{self.LOG_TAG}DownloadAdded event missing downloader name or hash.")
-                return
+        downloader_name = event.event_data.get("downloader")
+        _hash = event.event_data.get("hash")
+
+        if not downloader_name or not _hash:
+            logger.info(f"{self.LOG_TAG}DownloadAdded event missing downloader name or hash.")
+            return
 
+        try:
             if not self.service_infos:
                 logger.warning(f"{self.LOG_TAG}No active downloaders configured for DownloadAdded event.")
                 return
@@ -310,90 +672,329 @@ class TagMod(_PluginBase):
                 logger.info(f"{self.LOG_TAG}Downloader {downloader_name} not managed by this plugin or not active, skipping for DownloadAdded.")
                 return
 
+            self._shorten_interval()
+
             downloader_obj = service.instance
             torrents_data, error = downloader_obj.get_torrents(ids=_hash)
             if error or not torrents_data:
                 logger.error(f"{self.LOG_TAG}Failed to fetch torrent info for hash {_hash} from {downloader_name} on DownloadAdded: {error or 'Not found'}")
+                self._retry_or_rescan(downloader=downloader_name, _hash=_hash, error=str(error or "Not found"))
                 return
             
             torrent = torrents_data[0]
+            self._index_set_tags(downloader=downloader_name, _hash=_hash,
+                                 tags=self._get_tags(torrent=torrent, dl_type=service.type))
 
             _path = self._get_path(torrent=torrent, dl_type=service.type)
             if not _path:
                 logger.debug(f"{self.LOG_TAG}No save path found for torrent {_hash} on DownloadAdded.")
                 # Path might not be critical for all tagging rules, so we continue
 
-            # 解析映射表 (与 _complemented_tags 保持一致)
-            parsed_tracker_map = {}
-            if self._tracker_map and self._tracker_map != "tracker地址:站点标签":
-                for item in self._tracker_map.splitlines():
-                    if ":" in item:
-                        parts = item.split(":", 1)
-                        if parts[0].strip() and parts[1].strip():
-                            parsed_tracker_map[parts[0].strip()] = parts[1].strip()
-            
-            parsed_save_path_map = {}
-            if self._save_path_map and self._save_path_map != "保存地址:标签":
-                for item in self._save_path_map.splitlines():
-                    if ":" in item:
-                        parts = item.split(":", 1)
-                        if parts[0].strip() and parts[1].strip():
-                             parsed_save_path_map[parts[0].strip()] = parts[1].strip()
-
-            torrent_labels_to_apply = []
-            # 1. 从保存路径应用标签
-            if _path: # Ensure path exists before trying to match
-                for key, label in parsed_save_path_map.items():
-                    if key in _path:
-                        torrent_labels_to_apply.append(label)
-                        break 
-            
-            site_tag_from_rules = None
-            current_torrent_tags = self._get_tags(torrent=torrent, dl_type=service.type)
-            
-            # 2. 确定是否需要添加站点标签
-            apply_tracker_based_site_tag = True
-            if not self._cover: # 如果不是覆盖模式
-                # 动态获取最新的站点列表用于比较
-                indexers_set = set(indexer.get("name") for indexer in self.sites_helper.get_indexers() if indexer.get("name"))
-                if indexers_set.intersection(set(current_torrent_tags)): # 检查现有标签是否已有站点标签
-                    apply_tracker_based_site_tag = False 
-            
-            if apply_tracker_based_site_tag:
-                trackers = self._get_trackers(torrent=torrent, dl_type=service.type)
-                for tracker_url in trackers:
-                    for key, label in parsed_tracker_map.items():
-                        if key in tracker_url:
-                            site_tag_from_rules = label
-                            break
-                    if site_tag_from_rules:
-                        break
-                    domain = StringUtils.get_url_domain(tracker_url)
-                    site_info = self.sites_helper.get_indexer(domain)
-                    if site_info:
-                        site_tag_from_rules = site_info.get("name")
-                        break
-                if site_tag_from_rules and site_tag_from_rules not in torrent_labels_to_apply:
-                    torrent_labels_to_apply.append(site_tag_from_rules)
-
-            original_tags_for_api = current_torrent_tags
-            if self._cover:
-                if service.type == "qbittorrent" and current_torrent_tags and any(t.strip() for t in current_torrent_tags): # Check if list is not empty and contains non-whitespace tags
-                     downloader_obj.qbc.torrents_remove_tags(torrent_hashes=_hash, tags=current_torrent_tags)
-                original_tags_for_api = []
-
-            if torrent_labels_to_apply:
-                unique_labels_to_apply = list(dict.fromkeys(torrent_labels_to_apply)) # 保持顺序去重
-                self._set_torrent_info(service=service, 
-                                       _hash=_hash, 
-                                       _tags=unique_labels_to_apply,
-                                       _original_tags=original_tags_for_api)
-            else:
+            if not self._tag_torrent(service=service, torrent=torrent, _hash=_hash, _path=_path,
+                                     rules=self._get_tag_rules()):
                 logger.info(f"{self.LOG_TAG}No new tags to apply for torrent {_hash} on DownloadAdded event.")
+            self._profile_checkpoint()
 
         except Exception as e:
-            logger.error(f"{self.LOG_TAG}Error processing DownloadAdded event (Hash: {_hash if '_hash' in locals() else 'N/A'}): {str(e)}", exc_info=True)
+            logger.error(f"{self.LOG_TAG}Error processing DownloadAdded event (Hash: {_hash}): {str(e)}", exc_info=True)
+            self._retry_or_rescan(downloader=downloader_name, _hash=_hash, error=str(e))
+        finally:
+            self._flush_retry_queue()
+
+
+    def _get_tag_rules(self) -> Tuple[set, Dict[str, str], Dict[str, str]]:
+        """
+        获取打标签规则
+        :return: (站点名称集合, tracker映射, 保存路径映射)
+        """
+        indexers_set = set(indexer.get("name") for indexer in self.sites_helper.get_indexers() if indexer.get("name"))
+        return (indexers_set,
+                self._parse_map(self._tracker_map, "tracker地址:站点标签"),
+                self._parse_map(self._save_path_map, "保存地址:标签"))
+
+    @staticmethod
+    def _parse_map(map_str: str, placeholder: str) -> Dict[str, str]:
+        """
+        解析每行一个的 key:标签 配置
+        """
+        parsed_map = {}
+        if map_str and map_str != placeholder:
+            for item in map_str.splitlines():
+                if ":" in item:
+                    parts = item.split(":", 1)
+                    if parts[0].strip() and parts[1].strip():
+                        parsed_map[parts[0].strip()] = parts[1].strip()
+        return parsed_map
+
+    def _tag_torrent(self, service: ServiceInfo, torrent: Any, _hash: str, _path: str,
+                     rules: Tuple[set, Dict[str, str], Dict[str, str]]) -> bool:
+        """
+        按规则为单个种子补全标签，成功后将其移出重试队列
+        :return: 是否写入了标签
+        """
+        indexers_set, parsed_tracker_map, parsed_save_path_map = rules
+        torrent_labels_to_apply = []
+        # 1. 从保存路径应用标签
+        if _path:
+            for key, label in parsed_save_path_map.items():
+                if key in _path:
+                    torrent_labels_to_apply.append(label)
+                    break
+
+        site_tag_from_rules = None
+        current_torrent_tags = self._get_tags(torrent=torrent, dl_type=service.type)
+
+        # 2. 确定是否需要添加站点标签
+        apply_tracker_based_site_tag = True
+        if not self._cover: # 如果不是覆盖模式
+            if indexers_set.intersection(set(current_torrent_tags)): # 检查现有标签是否已有站点标签
+                apply_tracker_based_site_tag = False
+
+        if apply_tracker_based_site_tag:
+            trackers = self._get_trackers(torrent=torrent, dl_type=service.type)
+            for tracker_url in trackers:
+                # 先从自定义tracker map找
+                for key, label in parsed_tracker_map.items():
+                    if key in tracker_url:
+                        site_tag_from_rules = label
+                        break
+                if site_tag_from_rules:
+                    break
+                # 再从站点助手根据域名找
+                domain = StringUtils.get_url_domain(tracker_url)
+                site_info = self.sites_helper.get_indexer(domain)
+                if site_info:
+                    site_tag_from_rules = site_info.get("name")
+                    break
+            if site_tag_from_rules and site_tag_from_rules not in torrent_labels_to_apply:
+                torrent_labels_to_apply.append(site_tag_from_rules)
+
+        unique_labels_to_apply = list(dict.fromkeys(torrent_labels_to_apply)) # 保持顺序去重
+        original_tags_for_api = current_torrent_tags
+        if self._cover:
+            if unique_labels_to_apply and set(current_torrent_tags) == set(unique_labels_to_apply):
+                # 覆盖模式下标签已经一致，不再删除重写
+                self._remove_retry(downloader=service.name, _hash=_hash)
+                return False
+            if service.type == "qbittorrent" and current_torrent_tags and any(t.strip() for t in current_torrent_tags):
+                service.instance.qbc.torrents_remove_tags(torrent_hashes=_hash, tags=current_torrent_tags)
+                self._index_set_tags(downloader=service.name, _hash=_hash, tags=[])
+            original_tags_for_api = [] # 空列表表示覆盖模式下没有“原始”标签去比较差异
+
+        tagged = False
+        if unique_labels_to_apply:
+            tagged = self._set_torrent_info(service=service, _hash=_hash, _tags=unique_labels_to_apply,
+                                            _original_tags=original_tags_for_api)
+        self._remove_retry(downloader=service.name, _hash=_hash)
+        return tagged
+
+    def _add_retry(self, downloader: str, _hash: str, error: str) -> bool:
+        """
+        失败的种子加入重试队列，按指数退避计算下次重试时间，超过最大次数后放弃
+        :return: 是否已加入重试队列
+        """
+        key = f"{downloader}:{_hash}"
+        with self._retry_lock:
+            item = self._retry_queue.get(key) or {"downloader": downloader, "hash": _hash, "attempts": 0}
+            item["attempts"] += 1
+            if item["attempts"] > self._retry_max_attempts:
+                self._retry_queue.pop(key, None)
+                logger.error(f"{self.LOG_TAG}下载器: {downloader} 种子id: {_hash} 重试 {self._retry_max_attempts} 次仍失败，放弃: {error}")
+                queued = False
+            else:
+                delay = min(self._retry_base_delay * 2 ** (item["attempts"] - 1), self._retry_max_delay)
+                item["next_retry"] = time.time() + delay
+                item["error"] = error
+                self._retry_queue[key] = item
+                logger.info(f"{self.LOG_TAG}下载器: {downloader} 种子id: {_hash} 加入重试队列，{delay} 秒后第 {item['attempts']} 次重试")
+                queued = True
+            self._retry_dirty = True
+        return queued
+
+    def _remove_retry(self, downloader: str, _hash: str):
+        """
+        从重试队列中移除
+        """
+        if not self._retry_queue:
+            return
+        key = f"{downloader}:{_hash}"
+        with self._retry_lock:
+            if self._retry_queue.pop(key, None):
+                self._retry_dirty = True
+
+    def _flush_retry_queue(self):
+        """
+        保存有修改的重试队列
+        """
+        with self._retry_lock:
+            if not self._retry_dirty:
+                return
+            self.save_data("retry_queue", self._retry_queue)
+            self._retry_dirty = False
+
+    def _process_retry_queue(self):
+        """
+        在两次扫描之间按批处理已到期的重试项，不需要等待完整扫描
+        """
+        if not self._retry_queue:
+            return
+        now = time.time()
+        with self._retry_lock:
+            due_items = sorted((item for item in self._retry_queue.values() if item.get("next_retry", 0) <= now),
+                               key=lambda item: item.get("next_retry", 0))[:self._retry_batch_size]
+        if not due_items:
+            return
+        service_infos = self.service_infos
+        if not service_infos:
+            return
+        logger.info(f"{self.LOG_TAG}开始处理重试队列 ({len(due_items)}/{len(self._retry_queue)}) ...")
+        try:
+            self._retry_items(service_infos=service_infos, items=due_items)
+        finally:
+            self._flush_retry_queue()
+
+    def _retry_items(self, service_infos: Dict[str, ServiceInfo], items: List[Dict[str, Any]]):
+        """
+        重试一批种子
+        """
+        rules = self._get_tag_rules()
+        for item in items:
+            if self._event.is_set():
+                return
+            downloader, _hash = item.get("downloader"), item.get("hash")
+            service = service_infos.get(downloader)
+            if not service:
+                # 下载器已不在配置中则丢弃，否则等待下载器恢复连接
+                if downloader not in (self._downloaders or []):
+                    self._remove_retry(downloader=downloader, _hash=_hash)
+                continue
+            try:
+                torrents, error = service.instance.get_torrents(ids=_hash)
+                if error:
+                    self._retry_or_rescan(downloader=downloader, _hash=_hash, error=str(error))
+                    continue
+                if not torrents:
+                    logger.info(f"{self.LOG_TAG}下载器: {downloader} 种子id: {_hash} 已不存在，移出重试队列")
+                    self._remove_retry(downloader=downloader, _hash=_hash)
+                    self._index_remove(downloader=downloader, _hash=_hash)
+                    continue
+                torrent = torrents[0]
+                self._index_set_tags(downloader=downloader, _hash=_hash,
+                                     tags=self._get_tags(torrent=torrent, dl_type=service.type))
+                self._tag_torrent(service=service, torrent=torrent, _hash=_hash,
+                                  _path=self._get_path(torrent=torrent, dl_type=service.type), rules=rules)
+            except Exception as e:
+                logger.error(f"{self.LOG_TAG}下载器: {downloader} 种子id: {_hash} 重试失败: {str(e)}")
+                self._retry_or_rescan(downloader=downloader, _hash=_hash, error=str(e))
+
+    def _retry_or_rescan(self, downloader: str, _hash: str, error: str):
+        """
+        加入重试队列，重试次数用尽时清除变更标记，由下次运行完整扫描兜底
+        """
+        if not self._add_retry(downloader=downloader, _hash=_hash, error=error):
+            self._change_marks.pop(downloader, None)
 
+    def _begin_index_rebuild(self, downloader: str):
+        """
+        开始记录增量写入日志，需在获取种子列表之前调用
+        """
+        with self._index_lock:
+            self._index_journal[downloader] = []
+
+    def _cancel_index_rebuild(self, downloader: str):
+        """
+        获取种子列表失败，停止记录增量写入日志
+        """
+        with self._index_lock:
+            self._index_journal.pop(downloader, None)
+
+    def _rebuild_tag_index(self, service: ServiceInfo, torrents: List[Any]):
+        """
+        根据下载器完整种子列表重建该下载器的标签索引，并回放获取列表之后的增量写入
+        """
+        torrent_tags = {}
+        tag_index = {}
+        for torrent in torrents:
+            _hash = self._get_hash(torrent=torrent, dl_type=service.type)
+            if not _hash:
+                continue
+            tags = set(self._get_tags(torrent=torrent, dl_type=service.type))
+            torrent_tags[_hash] = tags
+            for tag in tags:
+                tag_index.setdefault(tag, set()).add(_hash)
+        with self._index_lock:
+            self._torrent_tags[service.name] = torrent_tags
+            self._tag_index[service.name] = tag_index
+            for op, _hash, tags in self._index_journal.pop(service.name, []):
+                self._index_apply(downloader=service.name, op=op, _hash=_hash, tags=tags)
+            self._index_time[service.name] = datetime.datetime.now(
+                tz=pytz.timezone(settings.TZ)).strftime("%Y-%m-%d %H:%M:%S")
+
+    def _index_set_tags(self, downloader: str, _hash: str, tags: List[str]):
+        """
+        替换标签索引中种子的全部标签
+        """
+        self._index_write(downloader=downloader, op="set", _hash=_hash, tags=tags)
+
+    def _index_add_tags(self, downloader: str, _hash: str, tags: List[str]):
+        """
+        向标签索引中的种子追加标签
+        """
+        self._index_write(downloader=downloader, op="add", _hash=_hash, tags=tags)
+
+    def _index_remove(self, downloader: str, _hash: str):
+        """
+        从标签索引中移除种子
+        """
+        self._index_write(downloader=downloader, op="remove", _hash=_hash, tags=[])
+
+    def _index_write(self, downloader: str, op: str, _hash: str, tags: List[str]):
+        """
+        增量写入标签索引，重建进行中时同时记入日志
+        """
+        with self._index_lock:
+            if downloader in self._index_journal:
+                self._index_journal[downloader].append((op, _hash, list(tags)))
+            if downloader not in self._tag_index:
+                # 尚未完整扫描的下载器不建立部分索引，避免查询结果不完整
+                return
+            self._index_apply(downloader=downloader, op=op, _hash=_hash, tags=tags)
+
+    def _index_apply(self, downloader: str, op: str, _hash: str, tags: List[str]):
+        """
+        执行一次索引写入，调用方需持有 _index_lock
+        """
+        if op == "set":
+            self._index_discard(downloader=downloader, _hash=_hash)
+            self._torrent_tags[downloader][_hash] = set()
+            self._index_add(downloader=downloader, _hash=_hash, tags=tags)
+        elif op == "add":
+            self._index_add(downloader=downloader, _hash=_hash, tags=tags)
+        else:
+            self._index_discard(downloader=downloader, _hash=_hash)
+
+    def _index_add(self, downloader: str, _hash: str, tags: List[str]):
+        """
+        追加标签，调用方需持有 _index_lock
+        """
+        torrent_tags = self._torrent_tags[downloader].setdefault(_hash, set())
+        tag_index = self._tag_index[downloader]
+        for tag in tags:
+            torrent_tags.add(tag)
+            tag_index.setdefault(tag, set()).add(_hash)
+
+    def _index_discard(self, downloader: str, _hash: str):
+        """
+        移除种子及其标签，调用方需持有 _index_lock
+        """
+        tag_index = self._tag_index[downloader]
+        for tag in self._torrent_tags[downloader].pop(_hash, set()):
+            hashes = tag_index.get(tag)
+            if hashes is None:
+                continue
+            hashes.discard(_hash)
+            if not hashes:
+                tag_index.pop(tag)
 
     @staticmethod
     def _get_hash(torrent: Any, dl_type: str):
@@ -436,9 +1037,13 @@ class TagMod(_PluginBase):
             logger.error(f"Error getting tags: {str(e)}")
             return []
 
-    def _set_torrent_info(self, service: ServiceInfo, _hash: str, _tags=None, _original_tags: list = None):
+    def _set_torrent_info(self, service: ServiceInfo, _hash: str, _tags=None, _original_tags: list = None) -> bool:
+        """
+        设置种子标签，结果与原有标签一致时不写入
+        :return: 标签是否发生了变化
+        """
         if not service or not service.instance:
-            return
+            return False
         downloader_obj = service.instance
         
         tags_to_log_and_set = [] # Default to empty list
@@ -454,12 +1059,14 @@ class TagMod(_PluginBase):
                 if tags_to_add:
                     downloader_obj.qbc.torrents_add_tags(torrent_hashes=_hash, tags=tags_to_add)
                     tags_to_log_and_set = tags_to_add
+                    self._index_add_tags(downloader=service.name, _hash=_hash, tags=tags_to_add)
             else: # Cover mode or no original tags to compare against
                 # Set mode: replace all tags with actual_tags_to_manipulate
                 # If _cover was true, existing tags were already removed in calling function for qB.
                 # If not _cover but _original_tags was None/empty, this effectively sets.
                 downloader_obj.qbc.torrents_set_tags(torrent_hashes=_hash, tags=actual_tags_to_manipulate)
                 tags_to_log_and_set = actual_tags_to_manipulate
+                self._index_set_tags(downloader=service.name, _hash=_hash, tags=actual_tags_to_manipulate)
         else: # Transmission, etc.
             # Transmission's API for setting labels usually replaces them.
             # If we need to merge, it has to be done before calling.
@@ -475,16 +1082,24 @@ class TagMod(_PluginBase):
                  # So, if site_first means site comes first, this is correct.
                 effective_tags_for_tr = effective_tags_for_tr[::-1]
 
+            if _original_tags is not None and set(effective_tags_for_tr) == set(_original_tags):
+                # 标签已经一致，无需重写
+                return False
+
             try:
                 # Assuming downloader_obj.trc for transmission client
                 downloader_obj.trc.change_torrent(ids=[_hash], labels=effective_tags_for_tr)
                 tags_to_log_and_set = effective_tags_for_tr # Log what was attempted to set
+                self._index_set_tags(downloader=service.name, _hash=_hash, tags=effective_tags_for_tr)
             except Exception as e:
-                 logger.error(f"{self.LOG_TAG}下载器: {service.name} 种子id: {_hash} 设置标签失败: {str(e)}")
+                logger.error(f"{self.LOG_TAG}下载器: {service.name} 种子id: {_hash} 设置标签失败: {str(e)}")
+                # 交给调用方加入重试队列
+                raise
 
 
         if tags_to_log_and_set: # Log only if some tags were actually intended to be set/added
             logger.warn(f"{self.LOG_TAG}下载器: {service.name} 种子id: {_hash}   标签: {','.join(tags_to_log_and_set)}")
+        return bool(tags_to_log_and_set)
 
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
@@ -557,6 +1172,75 @@ class TagMod(_PluginBase):
                             },
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'skip_unchanged',
+                                            'label': '无变化跳过',
+                                            'hint': '下载器自上次运行后没有新增或修改时跳过扫描',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VCheckboxBtn',
+                                        'props': {
+                                            'model': 'profile_next',
+                                            'label': '分析下次运行'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'profile_events',
+                                            'label': '分析事件次数',
+                                            'placeholder': '0'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'profile_top',
+                                            'label': '热点数量',
+                                            'placeholder': '20'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -600,7 +1284,8 @@ class TagMod(_PluginBase):
                                             'items': [
                                                 {'title': '禁用', 'value': '禁用'},
                                                 {'title': '计划任务', 'value': '计划任务'},
-                                                {'title': '固定间隔', 'value': '固定间隔'}
+                                                {'title': '固定间隔', 'value': '固定间隔'},
+                                                {'title': '自适应', 'value': '自适应'}
                                             ]
                                         }
                                     }
@@ -662,6 +1347,45 @@ class TagMod(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 6,
+                                    'md': 3,
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'interval_min',
+                                            'label': '自适应最小间隔(分钟)',
+                                            'placeholder': '5'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 6,
+                                    'md': 3,
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'interval_max',
+                                            'label': '自适应最大间隔(分钟)',
+                                            'placeholder': '60'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         "component": "VRow",
                         "content": [
@@ -734,10 +1458,16 @@ class TagMod(_PluginBase):
             "onlyonce": False,
             "cover": False,
             "site_first": False,
+            "skip_unchanged": False,
+            "profile_next": False,
+            "profile_events": "0",
+            "profile_top": "20",
             "interval": "计划任务",
             "interval_cron": "0 12 * * *",
             "interval_time": "24",
             "interval_unit": "小时",
+            "interval_min": "5",
+            "interval_max": "60",
             "tracker_map": "tracker地址:站点标签",
             "save_path_map": "保存地址:标签"
         }